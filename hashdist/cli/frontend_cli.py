@@ -181,9 +181,9 @@ class Status(ProfileFrontendBase):
     def profile_builder_action(self):
         report = self.builder.get_status_report()
         report = sorted(report.values(), key=lambda tup: tup[0].short_artifact_id.lower())
-        for build_spec, is_built in report:
-            status = 'OK' if is_built else 'needs build'
-            sys.stdout.write('%-50s [%s]\n' % (build_spec.short_artifact_id, status))
+        sys.stdout.write(''.join('%-50s [%s]\n' % (build_spec.short_artifact_id,
+                                                    'OK' if is_built else 'needs build')
+                                 for build_spec, is_built in report))
 
 @register_subcommand
 class Show(ProfileFrontendBase):
@@ -252,8 +252,8 @@ class GC(object):
             gc_roots_dir = ctx.get_config()['gc_roots']
             # write header to stderr, list to stdout
             sys.stderr.write("List of GC roots:\n")
-            for gc_root in os.listdir(gc_roots_dir):
-                sys.stdout.write("%s\n" % os.readlink(pjoin(gc_roots_dir, gc_root)))
+            sys.stdout.write(''.join("%s\n" % os.readlink(pjoin(gc_roots_dir, gc_root))
+                                     for gc_root in os.listdir(gc_roots_dir)))
         else:
             build_store = BuildStore.create_from_config(ctx.get_config(), ctx.logger)
             build_store.gc()
@@ -294,14 +294,14 @@ class LoadProfile(object):
             from ..core import BuildStore
             gc_roots_dir = ctx.get_config()['gc_roots']
             for gc_root in os.listdir(gc_roots_dir):
-                profile_name = os.path.basename(os.readlink(pjoin(gc_roots_dir,
-                    gc_root)))
+                profile_link = os.readlink(pjoin(gc_roots_dir, gc_root))
+                profile_name = os.path.basename(profile_link)
                 if profile_name == args.profile:
                     break
             else:
                 raise Exception("Profile '%s' not installed" % args.profile)
             try:
-                profile_path = os.readlink(os.readlink(pjoin(gc_roots_dir, gc_root)))
+                profile_path = os.readlink(profile_link)
             except OSError:
                 # FIXME: query our runtime database instead, it should be there
                 raise Exception("Profile '%s' was deleted" % args.profile)
@@ -353,8 +353,8 @@ class MvCpBase(object):
             else:
                 raise
         else:
-            f = open(artifact_id_file)
-            artifact_id = f.read().strip()
+            with f:
+                artifact_id = f.read().strip()
         build_store.create_symlink_to_artifact(artifact_id, args.target)
         cls._post_action(ctx, args, build_store)
 
@@ -439,5 +439,4 @@ class PrintLibs(object):
         libs = [os.path.join(dirpath, f)
                 for dirpath, dirnames, files in os.walk(args.profile)
                 for f in fnmatch.filter(files, "*.%s*" % args.suffix)]
-        for lib in libs:
-            sys.stdout.write(lib + '\n')
+        sys.stdout.write(''.join(lib + '\n' for lib in libs))
@@ -0,0 +1,12 @@
+import json
+
+from nose.tools import eq_
+
+from ...core.test.utils import logger
+from ..main import HashDistCommandContext
+
+def test_config_from_env():
+    config = {'build_stores': [{'dir': '/some/store'}], 'gc_roots': '/some/gcroots'}
+    env = {'HDIST_CONFIG': json.dumps(config)}
+    ctx = HashDistCommandContext(None, None, None, None, env, logger)
+    eq_(config, ctx.get_config())
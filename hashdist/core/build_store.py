@@ -329,28 +329,30 @@ class BuildStore(object):
         """
         name, digest = artifact_id.split('/')
         path = self._get_artifact_path(name, digest)
-        if not os.path.exists(path):
-            return None
-        else:
-            try:
-                f = open(pjoin(path, 'id'))
-            except IOError:
-                self._log_artifact_collision(path, '%s/%s' % (name, digest[:SHORT_ARTIFACT_ID_LEN]))
-                raise IllegalBuildStoreError('can not access file: %s/id' % path)
-            with f:
-                present_id = f.read().strip()
-                if present_id != artifact_id:
-                    self.logger.error('WARNING: An artifact with a hash that agrees in the first %d characters ' %
-                                      SHORT_ARTIFACT_ID_LEN)
-                    self.logger.error('is already installed. The two hashes are:')
-                    self.logger.error('')
-                    self.logger.error('    %s (already present)' % present_id)
-                    self.logger.error('    %s (wants to access/build)' % artifact_id)
-                    self.logger.error('')
-                    self.logger.error('The odds of this happening due to chance are very low.')
-                    self.logger.error('Please get in touch with the HashDist developer mailing list.')
-                    raise IllegalBuildStoreError('Hashes collide in first 12 chars: %s and %s' % (present_id, artifact_id))
-            return path
+        # Go straight for the id file; the common case in a populated
+        # store is that it is there, and we only need to look at the
+        # directory itself to tell "not built" from a broken artifact
+        try:
+            f = open(pjoin(path, 'id'))
+        except IOError as e:
+            if e.errno == errno.ENOENT and not os.path.exists(path):
+                return None
+            self._log_artifact_collision(path, '%s/%s' % (name, digest[:SHORT_ARTIFACT_ID_LEN]))
+            raise IllegalBuildStoreError('can not access file: %s/id' % path)
+        with f:
+            present_id = f.read().strip()
+            if present_id != artifact_id:
+                self.logger.error('WARNING: An artifact with a hash that agrees in the first %d characters ' %
+                                  SHORT_ARTIFACT_ID_LEN)
+                self.logger.error('is already installed. The two hashes are:')
+                self.logger.error('')
+                self.logger.error('    %s (already present)' % present_id)
+                self.logger.error('    %s (wants to access/build)' % artifact_id)
+                self.logger.error('')
+                self.logger.error('The odds of this happening due to chance are very low.')
+                self.logger.error('Please get in touch with the HashDist developer mailing list.')
+                raise IllegalBuildStoreError('Hashes collide in first 12 chars: %s and %s' % (present_id, artifact_id))
+        return path
 
     def is_present(self, build_spec):
         build_spec = as_build_spec(build_spec)
@@ -475,12 +477,13 @@ class BuildStore(object):
         # mark phase
         marked = set()
         for gc_root in os.listdir(self.gc_roots_dir):
+            gc_root_path = pjoin(self.gc_roots_dir, gc_root)
             try:
-                f = open(pjoin(self.gc_roots_dir, gc_root, 'artifact.json'))
+                f = open(pjoin(gc_root_path, 'artifact.json'))
             except IOError as e:
                 if e.errno == errno.ENOENT:
                     self.logger.warning("GC root link does not lead to artifact, removing: %s" % gc_root)
-                    silent_unlink(pjoin(self.gc_roots_dir, gc_root))
+                    silent_unlink(gc_root_path)
                 else:
                     raise
             else:
@@ -493,9 +496,11 @@ class BuildStore(object):
             if not artifact_id.startswith('virtual:'):
                 self.logger.info('Keeping %s' % shorten_artifact_id(artifact_id))
         # sweep phase
-        for artifact_name in os.listdir(self.artifact_root):
-            for short_digest in os.listdir(pjoin(self.artifact_root, artifact_name)):
-                artifact_dir = pjoin(self.artifact_root, artifact_name, short_digest)
+        artifact_root = self.artifact_root
+        for artifact_name in os.listdir(artifact_root):
+            name_dir = pjoin(artifact_root, artifact_name)
+            for short_digest in os.listdir(name_dir):
+                artifact_dir = pjoin(name_dir, short_digest)
                 artifact_id_file = pjoin(artifact_dir, 'id')
                 with open(artifact_id_file) as f:
                     artifact_id = f.read().strip()
@@ -19,7 +19,7 @@ import subprocess
 
 from .common import json_formatting_options
 from .build_store import BuildStore
-from .fileutils import rmdir_empty_up_to, write_protect, silent_unlink
+from .fileutils import rmdir_empty_up_to, write_protect, silent_unlink, silent_makedirs
 
 def execute_files_dsl(files, env):
     """
@@ -45,7 +45,7 @@ def execute_files_dsl(files, env):
         # Automatically create parent directory of target
         dirname, basename = os.path.split(target)
         if dirname != '' and not os.path.exists(dirname):
-            os.makedirs(dirname)
+            silent_makedirs(dirname)
 
         if sum(['text' in file_spec, 'object' in file_spec]) != 1:
             raise ValueError('objects in files section must contain either "text" or "object"')
@@ -330,12 +330,15 @@ def postprocess_sh_script(logger, patterns, artifact_dir, filename):
         cd "$o"
     """ % dict(up=up))).splitlines(True)
     with open(filename) as f:
-        lines = f.readlines(True)  # keepends=True
-    if not lines:
-        # empty
-        return
-    i = 1 if lines[0].startswith('#!') else 0
-    lines = lines[:i] + script + [line.replace(artifact_dir, '${HASHDIST_ARTIFACT}') for line in lines[i:]]
+        first = f.readline()
+        if not first:
+            # empty
+            return
+        if first.startswith('#!'):
+            lines = [first] + script
+        else:
+            lines = script + [first.replace(artifact_dir, '${HASHDIST_ARTIFACT}')]
+        lines.extend(line.replace(artifact_dir, '${HASHDIST_ARTIFACT}') for line in f)
     with open(filename, 'w') as f:
         f.write(''.join(lines))
 
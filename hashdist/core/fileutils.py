@@ -125,10 +125,16 @@ def rmdir_empty_up_to(path, parent):
         path, child = os.path.split(path)
 
 
-def gzip_compress(source_filename, dest_filename):
+def gzip_compress(source_filename, dest_filename, compresslevel=6):
+    """gzip `source_filename` to `dest_filename`
+
+    `compresslevel` defaults to 6 like the gzip command line tool rather
+    than the 9 of ``gzip.open``, which costs much more CPU for very little
+    gain on text such as build logs.
+    """
     chunk_size = 16 * 1024
     with open(source_filename, 'rb') as src:
-        with closing(gzip.open(dest_filename, 'wb')) as dst:
+        with closing(gzip.open(dest_filename, 'wb', compresslevel)) as dst:
             while True:
                 chunk = src.read(chunk_size)
                 if not chunk:
@@ -48,7 +48,7 @@ def hash_document(doctype, doc):
     check_no_floating_point(doc)
     serialized = json.dumps(doc, indent=None, sort_keys=True, separators=(',', ':'), encoding='utf-8',
                             ensure_ascii=True, allow_nan=False)
-    h = hashlib.sha256(doctype + '|')
+    h = hash_type(doctype + '|')
     h.update(serialized)
     return format_digest(h)
 
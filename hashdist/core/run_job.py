@@ -452,18 +452,17 @@ class CommandTreeExecution(object):
 
             if sum(['text' in input, 'json' in input, 'string' in input]) != 1:
                 raise ValueError("Need exactly one of 'text', 'json', 'string' in %r" % input)
-            if 'text' in input:
-                value = '\n'.join(input['text'])
-            elif 'string' in input:
-                value = input['string']
-            elif 'json' in input:
-                value = json.dumps(input['json'], indent=4)
+            if 'json' in input:
                 filename += '.json'
+                with open(filename, 'w') as f:
+                    json.dump(input['json'], f, indent=4)
             else:
-                assert False
-
-            with open(filename, 'w') as f:
-                f.write(value)
+                if 'text' in input:
+                    value = '\n'.join(input['text'])
+                else:
+                    value = input['string']
+                with open(filename, 'w') as f:
+                    f.write(value)
             env[name] = filename
         return env
 
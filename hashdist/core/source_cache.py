@@ -92,17 +92,24 @@ import tempfile
 import urllib2
 import json
 import shutil
-import hashlib
 import struct
 import errno
 import stat
+import mmap
+import tarfile
 from timeit import default_timer as clock
 import contextlib
 import urlparse
 from contextlib import closing
+from zipfile import ZipFile
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from StringIO import StringIO
 
 from .common import working_directory
-from .hasher import hash_document, format_digest, HashingReadStream, HashingWriteStream
+from .hasher import (hash_document, hash_type, format_digest, HashingReadStream,
+                     HashingWriteStream)
 from .fileutils import silent_makedirs
 from .decorators import retry
 
@@ -206,15 +213,23 @@ class SourceCache(object):
         self.cache_path = os.path.realpath(cache_path)
         self.logger = logger
         self.mirrors = mirrors
+        # Directories already created by _ensure_dir, so that repeated
+        # fetches don't hit the filesystem for every lookup
+        self._ensured_dirs = set()
+
+    def _ensure_dir(self, path):
+        if path not in self._ensured_dirs:
+            mkdir_if_not_exists(path)
+            self._ensured_dirs.add(path)
+        return path
 
     def _ensure_subdir(self, name):
-        path = pjoin(self.cache_path, name)
-        mkdir_if_not_exists(path)
-        return path
+        return self._ensure_dir(pjoin(self.cache_path, name))
 
     def delete_all(self):
         shutil.rmtree(self.cache_path)
         os.mkdir(self.cache_path)
+        self._ensured_dirs.clear()
 
     @staticmethod
     def create_from_config(config, logger, create_dirs=False):
@@ -304,17 +319,27 @@ class SourceCache(object):
         """
         return ArchiveSourceCache(self).put(files)
 
-    def _get_handler(self, type):
+    def _get_handler(self, type, show_progress=True):
         if type == 'git':
             handler = GitSourceCache(self)
         elif type == 'files' or type in archive_types:
-            handler = ArchiveSourceCache(self)
+            handler = ArchiveSourceCache(self, show_progress)
         else:
             raise ValueError('does not recognize key prefix: %s' % type)
         return handler
 
+    def contains(self, key):
+        """Whether the archive or ``files:`` pack identified by `key` is
+        present in the local cache. Git keys are not supported, as those
+        are looked up in a given repository.
+        """
+        type, hash = key.split(':')
+        if type == 'git':
+            raise ValueError('contains() does not support git keys')
+        return self._get_handler(type).contains(type, hash)
+
     @retry(max_tries=3, exceptions=(RemoteFetchError))
-    def fetch(self, url, key, repo_name=None):
+    def fetch(self, url, key, repo_name=None, show_progress=True):
         """Fetch sources whose key is known.
 
         This is the method to use in automated settings. If the
@@ -339,9 +364,13 @@ class SourceCache(object):
             otherwise. This must be present because a git "project" is distributed
             and cannot be deduced from URL (and pulling everything into the same
             repo was way too slow). Hopefully this can be mended in the future.
+
+        show_progress : bool
+            Whether to draw a progress bar on stdout while downloading
+            archives. Turn this off when fetching several sources at once.
         """
         type, hash = key.split(':')
-        handler = self._get_handler(type)
+        handler = self._get_handler(type, show_progress)
         handler.fetch(url, type, hash, repo_name)
 
     def unpack(self, key, target_path):
@@ -367,8 +396,7 @@ class SourceCache(object):
             Path to extract in
 
         """
-        if not os.path.exists(target_path):
-            os.makedirs(target_path)
+        silent_makedirs(target_path)
         if not ':' in key:
             raise ValueError("Key must be on form 'type:hash'")
         type, hash = key.split(':')
@@ -420,12 +448,29 @@ class GitSourceCache(object):
         if repo_name:
             repo_path = self.get_bare_repo_path(repo_name)
             if not os.path.exists(repo_path):
-                # TODO: This is not race-safe
-                os.makedirs(repo_path)
-                self.checked_git(repo_name, 'init', '--bare', '-q', repo_path)
+                self._init_bare_repo(repo_path)
             env['GIT_DIR'] = repo_path
         return env
 
+    def _init_bare_repo(self, repo_path):
+        # Initialize the repo in a temporary directory and rename it into
+        # place, so that a concurrent process never sees a directory at
+        # repo_path that is not yet a git repository
+        silent_makedirs(self.repo_path)
+        temp_dir = tempfile.mkdtemp(prefix='git-init-', dir=os.path.dirname(self.repo_path))
+        try:
+            temp_repo_path = pjoin(temp_dir, 'repo')
+            os.mkdir(temp_repo_path)
+            self.checked_git(None, 'init', '--bare', '-q', temp_repo_path)
+            try:
+                os.rename(temp_repo_path, repo_path)
+            except OSError, e:
+                # Somebody else created it in the meantime
+                if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                    raise
+        finally:
+            shutil.rmtree(temp_dir)
+
     @contextlib.contextmanager
     def _marked_commit(self, repo_name, commit):
         """Create temporary branch reference to commit"""
@@ -473,6 +518,22 @@ class GitSourceCache(object):
     def _mark_commit_as_in_use(self, repo_name, commit):
         self._ensure_branch(repo_name, 'inuse/%s' % commit, commit)
 
+    def _is_marked_in_use(self, repo_name, commit):
+        """Look for the branch made by `_mark_commit_as_in_use` directly in
+        the bare repo, as a loose ref or in packed-refs, without forking git
+        """
+        repo_path = self.get_bare_repo_path(repo_name)
+        ref = 'refs/heads/inuse/%s' % commit
+        if os.path.isfile(pjoin(repo_path, ref)):
+            return True
+        try:
+            f = open(pjoin(repo_path, 'packed-refs'))
+        except IOError:
+            return False
+        with f:
+            ref_line = '%s %s' % (commit, ref)
+            return any(line.rstrip() == ref_line for line in f)
+
     def fetch(self, url, type, commit, repo_name):
         assert type == 'git'
         if repo_name is None:
@@ -540,12 +601,18 @@ class GitSourceCache(object):
             if e.errno != errno.ENOENT:
                 raise
             repo_names = []
+        # Anything fetched through the source cache has an inuse/ branch,
+        # so look for that first before asking git about each repo in turn
         for repo_name in repo_names:
-            retcode, out, err = self.git(repo_name, 'rev-list', '-n1', '--quiet', hash)
-            if retcode == 0:
+            if self._is_marked_in_use(repo_name, hash):
                 break
         else:
-            raise KeyNotFoundError('Source item not present: git:%s' % hash)
+            for repo_name in repo_names:
+                retcode, out, err = self.git(repo_name, 'rev-list', '-n1', '--quiet', hash)
+                if retcode == 0:
+                    break
+            else:
+                raise KeyNotFoundError('Source item not present: git:%s' % hash)
 
         # We clone the repo with 'git clone --shared' and check out the hash
         repo_path = self.get_bare_repo_path(repo_name)
@@ -562,7 +629,8 @@ class GitSourceCache(object):
         # c) git submodule update --init
         with working_directory(target_path):
             if os.path.exists('.gitmodules'):
-                submodules = self._parse_submodule_config(repo_name, '.gitmodules')
+                out = self.checked_git(None, 'config', '-f', '.gitmodules', '--list')
+                submodules = self._parse_submodule_list(repo_name, out)
                 for key, submod in submodules.items():
                     self.checked_git(None, 'config', 'submodule.%s.url' % key, self.get_bare_repo_path(submod['name']))
                 self.checked_git(None, 'submodule', 'update', '--init')
@@ -571,9 +639,7 @@ class GitSourceCache(object):
     # Submodule support
     #
 
-    def _parse_submodule_config(self, root_repo_name, filename):
-        out = self.checked_git(None, 'config', '-f', filename, '--list')
-
+    def _parse_submodule_list(self, root_repo_name, out):
         # Example from unit-test of 'out' at this stage:
         # submodule.subdir/submod.path=subdir/submod
         # submodule.subdir/submod.url=/tmp/tmpuj84SH
@@ -604,20 +670,15 @@ class GitSourceCache(object):
         return submodules
 
     def _fetch_submodules(self, repo_name, repo_url, commit):
-        # use 'git show' to extract .gitmodules from the right commit
-        retcode, out, err = self.git(repo_name, 'show', '%s:.gitmodules' % commit)
+        retcode, out, err = self.git(repo_name, 'cat-file', '-e', '%s:.gitmodules' % commit)
         if retcode != 0:
             # No .gitmodules found
             return
-        # the 'git config' tool needs to read the input from a file though...
-        temp_dir = tempfile.mkdtemp()
-        try:
-            modules_config = pjoin(temp_dir, 'temp_gitmodules')
-            with open(modules_config, 'w') as f:
-                f.write(out)
-            submodules = self._parse_submodule_config(repo_name, modules_config)
-        finally:
-            shutil.rmtree(temp_dir)
+        # let 'git config' read .gitmodules straight from the blob in the right
+        # commit, rather than extracting it to a temporary file first
+        # (--blob requires git >= 1.8.4)
+        out = self.checked_git(repo_name, 'config', '--blob', '%s:.gitmodules' % commit, '--list')
+        submodules = self._parse_submodule_list(repo_name, out)
 
         # Recursively fetch the submodules. We need to look up the
         # commit using 'git ls-tree', since 'git submodule status'
@@ -643,9 +704,10 @@ class ArchiveSourceCache(object):
     chunk_size = 16 * 1024
 
 
-    def __init__(self, source_cache):
+    def __init__(self, source_cache, show_progress=True):
         assert not isinstance(source_cache, str)
         self.source_cache = source_cache
+        self.show_progress = show_progress
         self.files_path = source_cache.cache_path
         self.packs_path = source_cache._ensure_subdir(PACKS_DIRNAME)
         self.mirrors = source_cache.mirrors
@@ -653,8 +715,7 @@ class ArchiveSourceCache(object):
 
     def get_pack_filename(self, type, hash):
         d = self.files_path if type == 'files' else self.packs_path
-        type_dir = pjoin(d, type)
-        mkdir_if_not_exists(type_dir)
+        type_dir = self.source_cache._ensure_dir(pjoin(d, type))
         return pjoin(type_dir, hash)
 
     def _download_and_hash(self, url, type):
@@ -667,6 +728,7 @@ class ArchiveSourceCache(object):
         """
         # Provide a special case for local files
         use_urllib = not SIMPLE_FILE_URL_RE.match(url)
+        show_progress = use_urllib and self.show_progress
         if not use_urllib:
             try:
                 stream = open(url[len('file:'):])
@@ -692,8 +754,8 @@ class ArchiveSourceCache(object):
         temp_fd, temp_path = tempfile.mkstemp(prefix='downloading-', dir=self.packs_path)
         try:
             f = os.fdopen(temp_fd, 'wb')
-            tee = HashingWriteStream(hashlib.sha256(), f)
-            if use_urllib:
+            tee = HashingWriteStream(hash_type(), f)
+            if show_progress:
                 if 'Content-Length' in stream.headers:
                     progress = ProgressBar(int(stream.headers["Content-Length"]))
                 else:
@@ -703,14 +765,14 @@ class ArchiveSourceCache(object):
                 while True:
                     chunk = stream.read(self.chunk_size)
                     if not chunk: break
-                    if use_urllib:
+                    if show_progress:
                         n += len(chunk)
                         progress.update(n)
                     tee.write(chunk)
             finally:
                 stream.close()
                 f.close()
-                if use_urllib:
+                if show_progress:
                     progress.finish()
         except Exception as e:
             # Remove temporary file if there was a failure
@@ -788,8 +850,17 @@ class ArchiveSourceCache(object):
         type, hash = key.split(':')
         pack_filename = self.get_pack_filename(type, hash)
         if not os.path.exists(pack_filename):
-            with file(pack_filename, 'w') as f:
-                hit_pack(files, f)
+            # write to temporary file + atomic rename, so that an
+            # interrupted put never leaves a truncated pack under its key
+            fd, temp_filename = tempfile.mkstemp(prefix='packing-',
+                                                 dir=os.path.dirname(pack_filename))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    hit_pack(files, f)
+                os.chmod(temp_filename, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+                os.rename(temp_filename, pack_filename)
+            finally:
+                silent_unlink(temp_filename)
         return key
 
     def unpack(self, type, hash, target_dir):
@@ -851,7 +922,6 @@ class TarballHandler(object):
         self.logger = logger
 
     def verify(self, filename):
-        import tarfile
         try:
             with closing(self.tarfileobj_from_name(filename)) as tarfileobj:
                 with closing(tarfile.open(fileobj=tarfileobj, mode=self.read_mode)) as archive:
@@ -862,11 +932,10 @@ class TarballHandler(object):
             return False
 
     def unpack(self, infile, target_dir, hash):
-        import tarfile
         target_dir = os.path.abspath(target_dir)
 
         archive_data = infile.read()
-        if format_digest(hashlib.sha256(archive_data)) != hash:
+        if format_digest(hash_type(archive_data)) != hash:
             raise CorruptSourceCacheError("Corrupted file: '%s'" % infile.name)
 
         with closing(self.tarfileobj_from_data(archive_data)) as tarfileobj:
@@ -896,7 +965,6 @@ class TarballHandler(object):
         return open(filename, 'r');
 
     def tarfileobj_from_data(self, archive_data):
-        from StringIO import StringIO
         return StringIO(archive_data)
 
 
@@ -906,17 +974,30 @@ class TarSubprocessHandler(TarballHandler):
 
     This handler should only be used as fallback, it lacks some
     features and/or depends on the vagueries of the host tar.
+
+    Since tar reads the archive from disk we can not extract from a
+    verified in-memory copy; the hash is checked on an mmap of the file
+    right before calling tar instead, so it is read straight from the
+    page cache without copying it into Python strings.
     """
-    
+
     def verify(self, filename):
         return True
 
     def unpack(self, infile, target_dir, hash):
+        h = hash_type()
+        if os.fstat(infile.fileno()).st_size > 0:
+            # mmap refuses empty files
+            with closing(mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)) as m:
+                h.update(m)
+        if format_digest(h) != hash:
+            raise CorruptSourceCacheError("Corrupted file: '%s'" % infile.name)
+
         self.logger.debug('Calling tar to unpack %s -> %s', infile, target_dir)
         try:
             subprocess.check_call(['tar', 'xf', infile.name, '-C', target_dir, '--strip-components=1'])
         except subprocess.CalledProcessError:
-            raise CorruptSourceCacheError("Archive corrupt and/or cannot be unpacked: '%s'" % filename)
+            raise CorruptSourceCacheError("Archive corrupt and/or cannot be unpacked: '%s'" % infile.name)
 
 
 class TarGzHandler(TarballHandler):
@@ -944,9 +1025,15 @@ class TarXzHandler(TarballHandler):
 
     def tarfileobj_from_data(self, archive_data):
         # XXX: tarfile has built-in 'r:xz' support only in Python 3, so we use lzma module
-        # XXX: lzma.open() and lzma.LZMAFile() accept only file names, so we uncompress in memory
-        from StringIO import StringIO
-        return StringIO(lzma.LZMADecompressor().decompress(archive_data))
+        # XXX: lzma.open() and lzma.LZMAFile() accept only file names, so we uncompress
+        # XXX: chunk by chunk into an anonymous temporary file rather than keeping the
+        # XXX: whole uncompressed tarball in memory
+        decompressor = lzma.LZMADecompressor()
+        f = tempfile.TemporaryFile()
+        for i in xrange(0, len(archive_data), self.chunk_size):
+            f.write(decompressor.decompress(archive_data[i:i + self.chunk_size]))
+        f.seek(0)
+        return f
 
 
 try:
@@ -966,16 +1053,13 @@ class ZipHandler(object):
         self.logger = logger
 
     def verify(self, filename):
-        from zipfile import ZipFile
         with closing(ZipFile(filename)) as f:
             return f.testzip() is None # returns None if zip is OK
 
     def unpack(self, infile, target_dir, hash):
-        from zipfile import ZipFile
-        from StringIO import StringIO
         # only safe mode implemented as ZipFile does random access
         archive_data = infile.read()
-        if format_digest(hashlib.sha256(archive_data)) != hash:
+        if format_digest(hash_type(archive_data)) != hash:
             raise CorruptSourceCacheError("Corrupted file: '%s'" % infile.name)
         with closing(ZipFile(StringIO(archive_data))) as f:
             infolist = f.infolist()
@@ -1028,7 +1112,7 @@ def hit_pack(files, stream=None):
     The key of the resulting pack
     (e.g., ``files:cmRX4RyxU63D9Ciq8ZAfxWGjdMMOXn2mdCwHQqM4Zjw``).
     """
-    tee = HashingWriteStream(hashlib.sha256(), stream)
+    tee = HashingWriteStream(hash_type(), stream)
     tee.write('HDSTPCK1')
     files = sorted(files)
     for filename, contents in files:
@@ -1062,7 +1146,7 @@ def hit_unpack(stream, key):
     if not key.startswith('files:'):
         raise ValueError('invalid key')
     digest = key[len('files:'):]
-    tee = HashingReadStream(hashlib.sha256(), stream)
+    tee = HashingReadStream(hash_type(), stream)
     if tee.read(8) != 'HDSTPCK1':
         raise CorruptSourceCacheError('Not an hit-pack')
     files = []
@@ -1099,8 +1183,8 @@ def scatter_files(files, target_dir):
     for filename, contents in files:
         dirname, basename = os.path.split(filename)
         dirname = pjoin(target_dir, dirname)
-        if dirname not in existing_dir_cache and not os.path.exists(dirname):
-            os.makedirs(dirname)
+        if dirname not in existing_dir_cache:
+            silent_makedirs(dirname)
             existing_dir_cache.add(dirname)
 
         # IIUC in Python 3.3+ one can do this with the 'x' file mode, but need to do it
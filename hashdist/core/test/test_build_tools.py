@@ -8,7 +8,7 @@ from textwrap import dedent
 
 from nose.tools import eq_, ok_
 from .utils import (temp_working_dir, temp_working_dir_fixture, assert_raises,
-                    cat)
+                    cat, logger)
 from ..fileutils import touch
 
 from .. import build_tools
@@ -138,3 +138,18 @@ def test_python_shebang(d):
             #intp = runit(entry_point)
             #assert "%s/my-python/bin/python" % d == intp
 
+
+@temp_working_dir_fixture
+def test_postprocess_sh_script(d):
+    artifact_dir = os.path.realpath(d)
+    makedirs(pjoin(d, 'bin'))
+    script_file = pjoin(d, 'bin', 'foo-config')
+    # longer than a single read buffer
+    body = ''.join('echo %s/lib/%d\n' % (artifact_dir, i) for i in range(5000))
+    with open(script_file, 'w') as f:
+        f.write('#!/bin/sh\n' + body)
+    build_tools.postprocess_sh_script(logger, ['/bin/.*'], artifact_dir, script_file)
+    result = cat(script_file)
+    ok_(result.startswith('#!/bin/sh\n# Compute HASHDIST_ARTIFACT\n'))
+    ok_(result.endswith(body.replace(artifact_dir, '${HASHDIST_ARTIFACT}')))
+    ok_(artifact_dir not in result)
@@ -8,11 +8,12 @@ from StringIO import StringIO
 import stat
 import errno
 import logging
+import tarfile
 from contextlib import closing
 
 pjoin = os.path.join
 
-from ..source_cache import (ArchiveSourceCache, SourceCache,
+from ..source_cache import (ArchiveSourceCache, GitSourceCache, SourceCache,
         CorruptSourceCacheError, hit_pack, hit_unpack, scatter_files,
         KeyNotFoundError, SourceNotFoundError, SecurityError, RemoteFetchError)
 from ..hasher import Hasher, format_digest
@@ -22,6 +23,7 @@ from . import utils
 from hashdist.util.logger_fixtures import log_capture
 
 from nose.tools import eq_
+from nose import SkipTest
 
 #
 # Fixture
@@ -222,6 +224,32 @@ def test_git_fetch_git():
                 assert p.wait() == 0
                 assert out.strip() == mock_git_commit
 
+def test_git_unpack_packed_refs():
+    with temp_source_cache() as sc:
+        key = sc.fetch_git(mock_git_repo, 'master', 'foo')
+        gsc = GitSourceCache(sc)
+        assert gsc._is_marked_in_use('foo', mock_git_commit)
+        assert not gsc._is_marked_in_use('foo', mock_git_devel_branch_commit)
+        # the inuse/ branch is still found after 'git gc' moves it to packed-refs
+        gsc.checked_git('foo', 'pack-refs', '--all')
+        assert gsc._is_marked_in_use('foo', mock_git_commit)
+        with temp_dir() as d:
+            sc.unpack(key, pjoin(d, 'foo'))
+            with file(pjoin(d, 'foo', 'README')) as f:
+                assert f.read() == 'First revision'
+
+def test_git_init_bare_repo():
+    with temp_source_cache() as sc:
+        gsc = GitSourceCache(sc)
+        gsc.get_repo_env('foo')
+        repo_path = gsc.get_bare_repo_path('foo')
+        assert os.path.exists(pjoin(repo_path, 'HEAD'))
+        # losing the race against another process initializing the same repo
+        gsc._init_bare_repo(repo_path)
+        assert os.path.exists(pjoin(repo_path, 'HEAD'))
+        # no temporary directories left behind
+        eq_(['git'], os.listdir(sc.cache_path))
+
 def test_git_fetch():
     with temp_source_cache() as sc:
         sc.fetch(mock_git_repo, 'git:' + mock_git_commit, 'foo')
@@ -247,6 +275,24 @@ def test_git_fetch_submodules():
                     s = f.read()
                     assert s == content
 
+def test_git_fetch_malformed_gitmodules():
+    repo_dir = tempfile.mkdtemp()
+    try:
+        with working_directory(repo_dir):
+            repo = pjoin(repo_dir, '.git')
+            git('init', repo=repo)
+            git('config', 'user.name', 'Hashdist User', repo=repo)
+            git('config', 'user.email', 'hashdistuser@example.com', repo=repo)
+            cat('.gitmodules', '[submodule "broken"\n')
+            git('add', '.gitmodules', repo=repo)
+            git('commit', '-m', 'Broken .gitmodules', repo=repo)
+            commit = git('rev-list', '-n1', 'HEAD', repo=repo).strip()
+        with temp_source_cache() as sc:
+            with assert_raises(RuntimeError):
+                sc.fetch(repo_dir, 'git:' + commit, 'broken')
+    finally:
+        shutil.rmtree(repo_dir)
+
 def test_unpack_nonexisting_git():
     with temp_source_cache() as sc:
         with temp_dir() as d:
@@ -294,6 +340,47 @@ def test_corrupt_store():
                 sc.unpack(mock_tarball_hash, d)
             assert os.listdir(d) == []
 
+def test_tar_subprocess_hash_check():
+    from ..source_cache import TarSubprocessHandler
+    handler = TarSubprocessHandler(logger)
+    type, hash = mock_tarball_hash.split(':')
+    with temp_dir() as d:
+        with open(mock_tarball) as f:
+            handler.unpack(f, d, hash)
+        with file(pjoin(d, 'a', 'b', '0', 'README')) as f:
+            assert f.read() == 'file contents'
+    with temp_dir() as d:
+        with open(mock_tarball) as f:
+            with assert_raises(CorruptSourceCacheError):
+                handler.unpack(f, d, hash[:-8] + 'aaaaaaaa')
+        assert os.listdir(d) == []
+
+def test_tar_xz_unpack():
+    try:
+        import lzma
+    except ImportError:
+        raise SkipTest('lzma module not available')
+    from ..source_cache import TarXzHandler
+    # incompressible, so that the decompressor is fed several chunks
+    contents = os.urandom(4 * TarXzHandler.chunk_size)
+    buf = StringIO()
+    with closing(tarfile.open(fileobj=buf, mode='w')) as tar:
+        info = tarfile.TarInfo('pkg/data')
+        info.size = len(contents)
+        tar.addfile(info, StringIO(contents))
+    compressed = lzma.compress(buf.getvalue())
+    assert len(compressed) > TarXzHandler.chunk_size
+    with temp_source_cache() as sc:
+        with temp_dir() as d:
+            archive = pjoin(d, 'test.tar.xz')
+            with open(archive, 'wb') as f:
+                f.write(compressed)
+            key = sc.fetch_archive('file:' + archive)
+            eq_('tar.xz:' + format_digest(hashlib.sha256(compressed)), key)
+            sc.unpack(key, pjoin(d, 'unpacked'))
+            with open(pjoin(d, 'unpacked', 'data'), 'rb') as f:
+                assert f.read() == contents
+
 
 def test_does_not_re_download():
     with temp_source_cache() as sc:
@@ -316,10 +403,15 @@ def test_ensure_type():
 def test_put():
     with temp_source_cache() as sc:
         key = sc.put({'foofile': 'the contents'})
+        assert sc.contains(key)
+        assert not sc.contains('files:' + 'a' * 52)
         with temp_dir() as d:
             sc.unpack(key, d)
             with file(pjoin(d, 'foofile')) as f:
                 assert f.read() == 'the contents'
+        # no temporary files left behind next to the pack
+        type, hash = key.split(':')
+        eq_([hash], os.listdir(pjoin(sc.cache_path, type)))
 
 def test_simple_file_url_re():
     from ..source_cache import SIMPLE_FILE_URL_RE
@@ -1,4 +1,3 @@
-from pprint import pprint
 from . import package
 from . import utils
 from . import hook
@@ -46,6 +45,9 @@ class ProfileBuilder(object):
 
         for pkgname in self.profile.packages.keys():
             visit(pkgname)
+        # build dependencies as sets, for get_ready_list
+        self._build_dep_sets = dict((pkgname, frozenset(spec.build_deps))
+                                    for pkgname, spec in self._package_specs.iteritems())
 
 
     def _compute_specs(self):
@@ -85,13 +87,9 @@ class ProfileBuilder(object):
             traverse_depth_first(pkgname)
 
     def get_ready_list(self):
-        ready = []
-        for name, pkg in self._package_specs.iteritems():
-            if name in self._built:
-                continue
-            if all(dep_name in self._built for dep_name in pkg.build_deps):
-                ready.append(name)
-        return ready
+        built = self._built
+        return [name for name, build_deps in self._build_dep_sets.iteritems()
+                if name not in built and build_deps <= built]
 
     def get_build_spec(self, pkgname):
         return self._build_specs[pkgname]
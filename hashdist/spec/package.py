@@ -1,10 +1,13 @@
 import sys
 from collections import defaultdict
+from multiprocessing.pool import ThreadPool
 
 from .utils import substitute_profile_parameters, to_env_var
 from .. import core
 from .exceptions import ProfileError
 
+MAX_FETCH_THREADS = 4
+
 
 class PackageSpec(object):
     """
@@ -57,9 +60,47 @@ class PackageSpec(object):
                            loader.get_hook_files(), loader.parameters)
 
     def fetch_sources(self, source_cache):
+        # Archives are independent of each other and are downloaded
+        # concurrently; git sources all end up in the same repository
+        # (named after the package) and are fetched one at a time.
+        archive_clauses = []
+        git_clauses = []
         for source_clause in self.doc.get('sources', []):
+            if source_clause['key'].startswith('git:'):
+                git_clauses.append(source_clause)
+            elif not source_cache.contains(source_clause['key']):
+                archive_clauses.append(source_clause)
+        if len(archive_clauses) > 1:
+            self._fetch_concurrently(source_cache, archive_clauses)
+        else:
+            for source_clause in archive_clauses:
+                source_cache.fetch(source_clause['url'], source_clause['key'], self.name)
+        for source_clause in git_clauses:
             source_cache.fetch(source_clause['url'], source_clause['key'], self.name)
 
+    def _fetch_concurrently(self, source_cache, source_clauses):
+        def fetch(source_clause):
+            # progress bars of parallel downloads would overwrite each other
+            source_cache.fetch(source_clause['url'], source_clause['key'], self.name,
+                               show_progress=False)
+
+        pool = ThreadPool(min(len(source_clauses), MAX_FETCH_THREADS))
+        try:
+            result = pool.map_async(fetch, source_clauses)
+            # AsyncResult.get() without a timeout can not be interrupted by
+            # Ctrl-C on Python 2, so wait in short intervals instead
+            while not result.ready():
+                result.wait(0.5)
+            result.get()
+        except:
+            # don't wait for downloads still in progress; the worker
+            # threads are daemonic
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+            pool.join()
+
     def assemble_build_script(self, ctx):
         """
         Return the build script.
@@ -99,6 +99,7 @@ class PackageLoaderBase(object):
         """
         self.all_parents = []
         self.direct_parents = []
+        self._all_parent_names = set()
         if 'extends' not in self.doc:
             return
         for parent_name in sorted(self.doc['extends']):
@@ -108,12 +109,12 @@ class PackageLoaderBase(object):
     def _load_parent(self, parent_name):
         """Helper for :meth:`load_parents` """
         parent = PackageLoaderBase(parent_name, self.parameters, self.load_yaml)
-        all_names = set(p.name for p in self.all_parents)
-        new_names = set(p.name for p in parent.all_parents)
-        if all_names.intersection(new_names):
+        new_names = parent._all_parent_names | set([parent.name])
+        if not self._all_parent_names.isdisjoint(new_names):
             raise PackageError(parent_name,
                                'Diamond-pattern inheritance not yet supported, package "%s" shows up '
                                'twice when traversing parents' % parent_name)
+        self._all_parent_names.update(new_names)
         self.all_parents[0:0] = parent.all_parents + [parent]
         self.direct_parents[0:0] = [parent]
         return parent
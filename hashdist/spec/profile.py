@@ -15,6 +15,7 @@ import shutil
 from os.path import join as pjoin
 import re
 import glob
+import fnmatch
 from urlparse import urlsplit
 from urllib import urlretrieve
 import posixpath
@@ -349,6 +350,44 @@ class FileResolver(object):
     def __init__(self, checkouts_manager, search_dirs):
         self.checkouts_manager = checkouts_manager
         self.search_dirs = search_dirs
+        self._listdir_cache = {}
+
+    def _listdir(self, path):
+        """
+        Like ``os.listdir``, but cached for the lifetime of the resolver
+        and returning an empty list for missing directories. Each package
+        lookup globs the same overlay directories, so this saves a
+        readdir per overlay per package.
+        """
+        try:
+            return self._listdir_cache[path]
+        except KeyError:
+            try:
+                names = os.listdir(path)
+            except OSError:
+                names = []
+            self._listdir_cache[path] = names
+            return names
+
+    def _glob(self, pattern):
+        """
+        ``glob.glob`` served from the directory listing cache. Only the
+        last path component may contain wildcards; other patterns are
+        passed on to ``glob.glob``.
+        """
+        dirname, basename = os.path.split(pattern)
+        if not basename or glob.has_magic(dirname):
+            return glob.glob(pattern)
+        names = self._listdir(dirname)
+        if glob.has_magic(basename):
+            if not basename.startswith('.'):
+                names = [x for x in names if not x.startswith('.')]
+            names = fnmatch.filter(names, basename)
+        elif basename not in names:
+            names = []
+        else:
+            names = [basename]
+        return [pjoin(dirname, x) for x in names]
 
     def find_file(self, filenames):
         """
@@ -421,7 +460,7 @@ class FileResolver(object):
         for overlay in self.search_dirs[::-1]:
             basedir = self.checkouts_manager.resolve(overlay)
             for p in patterns:
-                for match in glob.glob(pjoin(basedir, p)):
+                for match in self._glob(pjoin(basedir, p)):
                     assert match.startswith(basedir)
                     if match_basename:
                         match_relname = os.path.basename(match)
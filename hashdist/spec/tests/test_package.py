@@ -1,9 +1,11 @@
 import logging
+import threading
 from pprint import pprint
 from os.path import join as pjoin
 from textwrap import dedent
 from ...core.test.utils import *
 from ...core.test.test_build_store import fixture as build_store_fixture
+from ...core.source_cache import SourceNotFoundError
 from .. import profile
 from .. import package
 from .. import package_loader
@@ -93,6 +95,71 @@ class MockPackageYAML(PackageYAML):
         self.hook_filename = hook_filename
 
 
+class MockSourceCache(object):
+    def __init__(self, cached=(), failing=(), concurrent=0):
+        self.cached = set(cached)
+        self.failing = set(failing)
+        self.fetched = []
+        self.lock = threading.Lock()
+        # fetches wait until `concurrent` of them are running at the same time
+        self.concurrent = concurrent
+        self.running = 0
+        self.all_running = threading.Event()
+
+    def contains(self, key):
+        return key in self.cached
+
+    def fetch(self, url, key, repo_name, show_progress=True):
+        if self.concurrent and not key.startswith('git:'):
+            with self.lock:
+                self.running += 1
+                if self.running == self.concurrent:
+                    self.all_running.set()
+            if not self.all_running.wait(5):
+                raise AssertionError('archive sources were not fetched concurrently')
+        if key in self.failing:
+            raise SourceNotFoundError(url)
+        with self.lock:
+            self.fetched.append((url, key, repo_name, show_progress))
+
+
+def test_fetch_sources():
+    doc = marked_yaml_load(dedent("""\
+        sources:
+          - url: http://foo/a.tar.gz
+            key: tar.gz:a
+          - url: git://foo
+            key: git:a3c39a03e7b8e9a3321d69ff877338f99ebb4aa2
+          - url: http://foo/b.tar.gz
+            key: tar.gz:b
+          - url: http://foo/c.zip
+            key: zip:c
+          - url: http://foo/d.zip
+            key: zip:d
+    """))
+    p = package.PackageSpec("mylib", doc, [], {})
+    source_cache = MockSourceCache(cached=['zip:d'], concurrent=3)
+    p.fetch_sources(source_cache)
+    # archives are fetched in parallel without progress bars; cached ones are skipped
+    eq_(sorted(source_cache.fetched),
+        [('git://foo', 'git:a3c39a03e7b8e9a3321d69ff877338f99ebb4aa2', 'mylib', True),
+         ('http://foo/a.tar.gz', 'tar.gz:a', 'mylib', False),
+         ('http://foo/b.tar.gz', 'tar.gz:b', 'mylib', False),
+         ('http://foo/c.zip', 'zip:c', 'mylib', False)])
+
+    # a single archive left to fetch is fetched directly
+    source_cache = MockSourceCache(cached=['tar.gz:a', 'zip:c', 'zip:d'])
+    p.fetch_sources(source_cache)
+    eq_(sorted(source_cache.fetched),
+        [('git://foo', 'git:a3c39a03e7b8e9a3321d69ff877338f99ebb4aa2', 'mylib', True),
+         ('http://foo/b.tar.gz', 'tar.gz:b', 'mylib', True)])
+
+    # errors from a parallel fetch are raised to the caller
+    source_cache = MockSourceCache(failing=['tar.gz:b'])
+    with assert_raises(SourceNotFoundError):
+        p.fetch_sources(source_cache)
+
+
 class MockProfile(object):
 
     def __init__(self, files):
@@ -124,6 +191,13 @@ def test_prevent_diamond():
         'd.yaml': '{}'}
     with assert_raises(PackageError):
         package.PackageSpec.load(MockProfile(files), 'a')
+    # direct parent that is also inherited through another parent
+    files = {
+        'a.yaml': 'extends: [b, c]',
+        'b.yaml': 'extends: [c]',
+        'c.yaml': '{}'}
+    with assert_raises(PackageError):
+        package.PackageSpec.load(MockProfile(files), 'a')
 
 def test_inheritance_collision():
     files = {
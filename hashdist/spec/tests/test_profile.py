@@ -190,6 +190,22 @@ def test_file_resolver_glob(d):
         'foo/foo-2.yaml': ('foo/foo-*.yaml', '%s/level1/foo/foo-2.yaml' % d),
         'foo/foo-3.yaml': ('foo/foo-*.yaml', '%s/level1/foo/foo-3.yaml' % d)})
 
+    # directory listings are cached, and hidden files skipped like glob does
+    dump(pjoin(d, "level1", "foo", ".foo-4.yaml"), "{my: document}")
+    listed = []
+    real_listdir = os.listdir
+    def listdir(path):
+        listed.append(path)
+        return real_listdir(path)
+    os.listdir = listdir
+    try:
+        eq_(matches, r.glob_files(['foo/foo-*.yaml', 'foo/*0.yaml', 'bar.yaml']))
+    finally:
+        os.listdir = real_listdir
+    eq_([], listed)
+    r = profile.FileResolver(MockCheckoutsManager(), [pjoin(d, 'level2'), pjoin(d, 'level1')])
+    eq_(matches, r.glob_files(['foo/foo-*.yaml', 'foo/*0.yaml', 'bar.yaml']))
+
 
 @temp_working_dir_fixture
 def test_resource_resolution(d):